@@ -8,18 +8,45 @@ This script verifies:
 """
 
 import sys
-import json
+import atexit
+import itertools
+import functools
 from pathlib import Path
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import serialization
-import snowflake.connector
+import orjson
 
 
 # Path to the config file (relative to this script)
-CONFIG_PATH = Path(__file__).parent / 'config.json'
+CONFIG_PATH = (Path(__file__).parent / 'config.json').resolve()
 
 # Path to the private key file (relative to this script)
-PRIVATE_KEY_PATH = Path(__file__).parent.parent / 'rsa_key.p8'
+PRIVATE_KEY_PATH = (Path(__file__).parent.parent / 'rsa_key.p8').resolve()
+
+# Fields that must be present in config.json
+REQUIRED_FIELDS = frozenset({'account', 'user', 'warehouse', 'database', 'schema', 'role'})
+
+# Column layout for the sample data table (ID, Name, Description)
+ROW_FMT = "   {:<5} {:<20} {:<30}".format
+
+# Snowflake connection reused across test runs in the same process, and the
+# connect parameters it was opened with
+_CONN = None
+_CONN_KEY = None
+
+
+@functools.lru_cache(maxsize=4)
+def _read_config(config_path_str, mtime_ns):
+    """
+    Read and parse the config file, cached by path and modification time
+    
+    Args:
+        config_path_str: Path to the config.json file as a string
+        mtime_ns: Modification time of the file, so edits invalidate the cache
+        
+    Returns:
+        Parsed JSON content
+    """
+    with open(config_path_str, 'rb') as f:
+        return orjson.loads(f.read())
 
 
 def load_config(config_path):
@@ -32,7 +59,7 @@ def load_config(config_path):
     Returns:
         Dictionary with Snowflake connection parameters
     """
-    if not config_path.exists():
+    if not config_path.is_file():
         print(f"Error: Config file not found at {config_path}")
         print("\nPlease create config.json from config.template.json:")
         print(f"  cp {config_path.parent / 'config.template.json'} {config_path}")
@@ -40,19 +67,22 @@ def load_config(config_path):
         sys.exit(1)
     
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        config = _read_config(str(config_path), config_path.stat().st_mtime_ns)
+        
+        if not isinstance(config, dict):
+            print("Error: config.json must contain a JSON object with the Snowflake connection parameters")
+            sys.exit(1)
         
         # Validate required fields
-        required_fields = ['account', 'user', 'warehouse', 'database', 'schema', 'role']
-        missing_fields = [field for field in required_fields if field not in config]
+        missing_fields = REQUIRED_FIELDS - config.keys()
         
         if missing_fields:
-            print(f"Error: Missing required fields in config.json: {', '.join(missing_fields)}")
+            print(f"Error: Missing required fields in config.json: {', '.join(sorted(missing_fields))}")
             sys.exit(1)
         
-        return config
-    except json.JSONDecodeError as e:
+        # Copy so callers can't mutate the cached dict
+        return dict(config)
+    except orjson.JSONDecodeError as e:
         print(f"Error: Invalid JSON in config file: {e}")
         sys.exit(1)
     except Exception as e:
@@ -70,7 +100,26 @@ def load_private_key(key_path):
     Returns:
         Encoded private key bytes
     """
-    with open(key_path, 'rb') as key_file:
+    return _load_der(str(key_path), key_path.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=2)
+def _load_der(key_path_str, mtime_ns):
+    """
+    Parse the PEM private key and serialize it to DER, cached by path and modification time
+    
+    Args:
+        key_path_str: Path to the private key file as a string
+        mtime_ns: Modification time of the file, so a rotated key invalidates the cache
+        
+    Returns:
+        DER-encoded PKCS8 private key bytes
+    """
+    # Imported here so paths that never parse a key (e.g. load_config) skip its startup cost
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+    
+    with open(key_path_str, 'rb') as key_file:
         p_key = serialization.load_pem_private_key(
             key_file.read(),
             password=None,  # No password since we used -nocrypt
@@ -86,6 +135,86 @@ def load_private_key(key_path):
     return pkb
 
 
+class Log:
+    """
+    Buffer output lines and write them to stdout in a single call per flush
+    """
+    
+    def __init__(self):
+        self.lines = []
+    
+    def add(self, line=""):
+        """
+        Queue a line of output
+        
+        Args:
+            line: Text to write (without trailing newline)
+        """
+        self.lines.append(line)
+    
+    def flush(self):
+        """
+        Write all queued lines to stdout and clear the buffer
+        """
+        if self.lines:
+            sys.stdout.write("\n".join(self.lines) + "\n")
+            sys.stdout.flush()
+            self.lines.clear()
+
+
+def _close_connection():
+    """
+    Close the shared Snowflake connection, if one is open
+    """
+    if _CONN is not None and not _CONN.is_closed():
+        _CONN.close()
+
+
+atexit.register(_close_connection)
+
+
+def get_connection(config, private_key_bytes):
+    """
+    Return the shared Snowflake connection, connecting only if needed
+    
+    Reusing the connection skips the TLS handshake and JWT authentication
+    on every test run after the first one. A call with a different config or
+    key closes the shared connection and opens a new one.
+    
+    Args:
+        config: Dictionary with Snowflake connection parameters
+        private_key_bytes: DER-encoded private key for RSA authentication
+        
+    Returns:
+        Open Snowflake connection
+    """
+    global _CONN, _CONN_KEY
+    conn_key = tuple(config[field] for field in sorted(REQUIRED_FIELDS)) + (private_key_bytes,)
+    if _CONN is not None and not _CONN.is_closed() and _CONN_KEY == conn_key:
+        return _CONN
+    
+    # Drop any session opened with different parameters before reconnecting
+    _close_connection()
+    
+    # Heaviest import in the script; only needed once we actually connect
+    import snowflake.connector
+    
+    _CONN = snowflake.connector.connect(
+        account=config['account'],
+        user=config['user'],
+        private_key=private_key_bytes,
+        warehouse=config['warehouse'],
+        database=config['database'],
+        schema=config['schema'],
+        role=config['role'],
+        # Keep the reused session alive and download result chunks in parallel
+        client_session_keep_alive=True,
+        client_prefetch_threads=4
+    )
+    _CONN_KEY = conn_key
+    return _CONN
+
+
 def test_connection(config):
     """
     Test the Snowflake connection with RSA key authentication
@@ -93,125 +222,148 @@ def test_connection(config):
     Args:
         config: Dictionary with Snowflake connection parameters
     """
-    print("=" * 60)
-    print("ETL Service Account Connection Test")
-    print("=" * 60)
+    log = Log()
+    try:
+        return _run_tests(config, log)
+    finally:
+        # Write out whatever the last (possibly failed) step left buffered
+        log.flush()
+
+
+def _run_tests(config, log):
+    """
+    Run the numbered connection tests, flushing the log at each step header and result
+    
+    Args:
+        config: Dictionary with Snowflake connection parameters
+        log: Log collecting the output lines
+        
+    Returns:
+        True if every test passed, False otherwise
+    """
+    log.add("=" * 60)
+    log.add("ETL Service Account Connection Test")
+    log.add("=" * 60)
     
     # Load the private key
-    print("\n1. Loading RSA private key...")
+    log.add("\n1. Loading RSA private key...")
+    log.flush()
     try:
         private_key_bytes = load_private_key(PRIVATE_KEY_PATH)
-        print("   ✓ Private key loaded successfully")
+        log.add("   ✓ Private key loaded successfully")
     except Exception as e:
-        print(f"   ✗ Error loading private key: {e}")
+        log.add(f"   ✗ Error loading private key: {e}")
         return False
+    log.flush()
     
     # Establish connection
-    print("\n2. Connecting to Snowflake...")
+    log.add("\n2. Connecting to Snowflake...")
+    log.flush()
     try:
-        conn = snowflake.connector.connect(
-            account=config['account'],
-            user=config['user'],
-            private_key=private_key_bytes,
-            warehouse=config['warehouse'],
-            database=config['database'],
-            schema=config['schema'],
-            role=config['role']
-        )
-        print("   ✓ Connected successfully!")
-        print(f"   Account: {config['account']}")
-        print(f"   User: {config['user']}")
-        print(f"   Role: {config['role']}")
+        conn = get_connection(config, private_key_bytes)
+        log.add("   ✓ Connected successfully!")
+        log.add(f"   Account: {config['account']}")
+        log.add(f"   User: {config['user']}")
+        log.add(f"   Role: {config['role']}")
     except Exception as e:
-        print(f"   ✗ Connection failed: {e}")
+        log.add(f"   ✗ Connection failed: {e}")
         return False
+    log.flush()
     
+    cursor = conn.cursor()
     try:
-        cursor = conn.cursor()
+        test_data = [
+            (1, 'Test Record 1', 'First test record for ETL service account'),
+            (2, 'Test Record 2', 'Second test record with RSA authentication'),
+            (3, 'Test Record 3', 'Third test record to verify INSERT permissions'),
+            (4, 'Test Record 4', 'Fourth test record for validation'),
+            (5, 'Test Record 5', 'Fifth and final test record')
+        ]
+        
+        # Tests 3-5 are sent as one multi-statement request (a single round-trip);
+        # the result of each statement is then read back in turn with nextset().
+        # Values use the default client-side pyformat binding, since Snowflake does
+        # not support server-side bind variables in multi-statement requests.
+        values_sql = ", ".join(["(%s, %s, %s)"] * len(test_data))
+        flat_params = list(itertools.chain.from_iterable(test_data))
         
-        # Test 3: Create a test table
-        print("\n3. Creating test table...")
+        # Test 3: Create a test table (temporary, so it is dropped with the session).
+        # CREATE OR REPLACE always yields a fresh session-scoped table, which also
+        # shadows any permanent test_etl_connection left behind in the schema.
+        log.add("\n3. Creating test table...")
+        log.flush()
         try:
-            cursor.execute("""
-                CREATE OR REPLACE TABLE test_etl_connection (
+            cursor.execute(f"""
+                CREATE OR REPLACE TEMPORARY TABLE test_etl_connection (
                     id INTEGER,
                     name VARCHAR(100),
                     created_at TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
                     description VARCHAR(500)
-                )
-            """)
-            print("   ✓ Table 'test_etl_connection' created successfully")
+                );
+                INSERT INTO test_etl_connection (id, name, description) VALUES {values_sql};
+                SELECT *, COUNT(*) OVER () AS total_count FROM test_etl_connection ORDER BY id;
+            """, flat_params, num_statements=3)
+            log.add("   ✓ Table 'test_etl_connection' created successfully")
         except Exception as e:
-            print(f"   ✗ Error creating table: {e}")
+            log.add(f"   ✗ Error creating, populating or querying table: {e}")
             return False
+        log.flush()
         
         # Test 4: Insert test data
-        print("\n4. Inserting test data...")
-        test_data = [
-            (1, 'Test Record 1', 'First test record for ETL service account'),
-            (2, 'Test Record 2', 'Second test record with RSA authentication'),
-            (3, 'Test Record 3', 'Third test record to verify INSERT permissions'),
-            (4, 'Test Record 4', 'Fourth test record for validation'),
-            (5, 'Test Record 5', 'Fifth and final test record')
-        ]
-        
+        log.add("\n4. Inserting test data...")
+        log.flush()
         try:
-            for record in test_data:
-                cursor.execute(
-                    "INSERT INTO test_etl_connection (id, name, description) VALUES (%s, %s, %s)",
-                    record
-                )
-            print(f"   ✓ Inserted {len(test_data)} test records")
+            cursor.nextset()
+            # The INSERT row count is checked client-side; no COUNT(*) query is needed
+            inserted = cursor.rowcount
+            if inserted != len(test_data):
+                log.add(f"   ✗ Error inserting data: expected {len(test_data)} records, inserted {inserted}")
+                return False
+            log.add(f"   ✓ Inserted {inserted} test records")
         except Exception as e:
-            print(f"   ✗ Error inserting data: {e}")
+            log.add(f"   ✗ Error inserting data: {e}")
             return False
+        log.flush()
         
         # Test 5: Query the data back
-        print("\n5. Querying test data...")
+        log.add("\n5. Querying test data...")
+        log.flush()
         try:
-            cursor.execute("SELECT * FROM test_etl_connection ORDER BY id")
-            results = cursor.fetchall()
-            print(f"   ✓ Query successful! Retrieved {len(results)} records")
-            print("\n   Sample data:")
-            print("   " + "-" * 56)
-            print(f"   {'ID':<5} {'Name':<20} {'Description':<30}")
-            print("   " + "-" * 56)
-            for row in results[:3]:  # Show first 3 records
-                print(f"   {row[0]:<5} {row[1]:<20} {row[3][:30]:<30}")
-            if len(results) > 3:
-                print(f"   ... and {len(results) - 3} more record(s)")
+            # The windowed COUNT carries the table row count, so step 6 needs no extra query
+            cursor.nextset()
+            # Only the first 3 records are displayed, so fetch just those
+            sample = cursor.fetchmany(3)
+            count = sample[0][-1] if sample else 0
+            log.add(f"   ✓ Query successful! Retrieved {count} records")
+            log.add("\n   Sample data:")
+            log.add("   " + "-" * 56)
+            log.add(ROW_FMT('ID', 'Name', 'Description'))
+            log.add("   " + "-" * 56)
+            for row in sample:
+                log.add(ROW_FMT(row[0], row[1], row[3][:30]))
+            if count > 3:
+                log.add(f"   ... and {count - 3} more record(s)")
         except Exception as e:
-            print(f"   ✗ Error querying data: {e}")
+            log.add(f"   ✗ Error querying data: {e}")
             return False
+        log.flush()
         
         # Test 6: Verify row count
-        print("\n6. Verifying data integrity...")
-        try:
-            cursor.execute("SELECT COUNT(*) FROM test_etl_connection")
-            count = cursor.fetchone()[0]
-            print(f"   ✓ Total records in table: {count}")
-            assert count == len(test_data), "Row count mismatch!"
-        except Exception as e:
-            print(f"   ✗ Error verifying data: {e}")
+        log.add("\n6. Verifying data integrity...")
+        log.flush()
+        log.add(f"   ✓ Total records in table: {count}")
+        if count != len(test_data):
+            log.add("   ✗ Error verifying data: Row count mismatch!")
             return False
-        
-        # Optional: Clean up (comment out if you want to keep the test table)
-        print("\n7. Cleaning up test table...")
-        try:
-            cursor.execute("DROP TABLE IF EXISTS test_etl_connection")
-            print("   ✓ Test table dropped")
-        except Exception as e:
-            print(f"   ⚠ Warning: Could not drop test table: {e}")
-        
-        cursor.close()
+        log.flush()
         
     finally:
-        conn.close()
-        print("\n8. Connection closed")
+        # The connection itself stays open for reuse and is closed at exit
+        cursor.close()
     
-    print("\n" + "=" * 60)
-    print("✓ All tests passed successfully!")
-    print("=" * 60)
+    log.add("\n" + "=" * 60)
+    log.add("✓ All tests passed successfully!")
+    log.add("=" * 60)
     return True
 
 
@@ -221,7 +373,7 @@ if __name__ == '__main__':
     config = load_config(CONFIG_PATH)
     
     # Check if private key file exists
-    if not PRIVATE_KEY_PATH.exists():
+    if not PRIVATE_KEY_PATH.is_file():
         print(f"Error: Private key file not found at {PRIVATE_KEY_PATH}")
         print("Please ensure rsa_key.p8 exists in the parent directory")
         sys.exit(1)